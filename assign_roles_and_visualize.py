@@ -1,19 +1,107 @@
 import networkx as nx
 import matplotlib.pyplot as plt
+from matplotlib.colors import to_hex
+import numpy as np
 import random
+import warnings
+from itertools import islice
+
+from syntheticdata import _STATE_CODES
+
+try:
+    from fa2 import ForceAtlas2
+except ImportError:
+    try:  # Maintained fork with the same API
+        from fa2_modified import ForceAtlas2
+    except ImportError:  # Optional dependency; fall back to nx.spring_layout
+        ForceAtlas2 = None
+
+try:
+    from numba import njit, prange
+except ImportError:  # Optional dependency; the layout kernel then stays uncompiled
+    njit = None
+    prange = range
+
+# nx.spring_layout uses a dense solver below 500 nodes (measured 0.03 s at 100 nodes,
+# 0.6 s at 499) and a far slower sparse one from 500 on (0.9 s at 500, 3 s at 1000,
+# against 0.05 s and 0.17 s per call for the cached Numba kernel). Below that size the
+# dense path is quick enough not to risk the one-off ~2.5 s JIT compile of a cold cache.
+_NUMBA_LAYOUT_MIN_NODES = 500
+
+# Node attributes holding states, written as _STATE_CODES by syntheticdata.py
+_STATE_ATTRIBUTES = ("true_state", "state")
+# Accept both the codes and their labels, so older label-valued files still load
+_STATE_LOOKUP = {**_STATE_CODES, **{code: code for code in _STATE_CODES.values()}}
 
 
 def load_graph(input_file):
     """
     Load a GraphML file into a NetworkX graph.
 
+    GraphML key defaults, which `nx.read_graphml` only records in
+    `G.graph["node_default"]`, are filled in on every node that lacks them.
+
     Parameters:
     - input_file (str): The path to the GraphML file to load.
 
     Returns:
     - G (networkx.Graph): The loaded NetworkX graph.
     """
-    return nx.read_graphml(input_file)
+    G = nx.read_graphml(input_file)
+    node_default = G.graph.get("node_default", {})
+    if node_default:
+        for _, data in G.nodes(data=True):
+            for key, value in node_default.items():
+                data.setdefault(key, value)
+    return G
+
+
+def to_csr(G):
+    """
+    Convert a graph's adjacency to a CSR sparse matrix in `list(G)` node order.
+
+    Parameters:
+    - G (networkx.Graph): The NetworkX graph.
+
+    Returns:
+    - scipy.sparse.csr_array: The adjacency matrix; `indptr` and `indices`
+                              hold the neighbor lists as contiguous arrays.
+    """
+    return nx.to_scipy_sparse_array(G, nodelist=list(G), format="csr", dtype=np.float32)
+
+
+def encode_states(G, attribute):
+    """
+    Encode a state attribute as an int8 array in `list(G)` node order.
+
+    Parameters:
+    - G (networkx.Graph): The NetworkX graph.
+    - attribute (str): The node attribute to encode (e.g., 'true_state' or 'state').
+
+    Returns:
+    - numpy.ndarray: Codes from `_STATE_CODES`, or -1 for missing or unknown values.
+    """
+    return np.fromiter(
+        (_STATE_LOOKUP.get(value, -1) for _, value in G.nodes(data=attribute)),
+        dtype=np.int8,
+        count=len(G)
+    )
+
+
+def _csr_edge_list(A):
+    """
+    List each undirected edge of a symmetric CSR adjacency matrix once.
+
+    Parameters:
+    - A (scipy.sparse.csr_array): The adjacency matrix, e.g. from `to_csr`.
+
+    Returns:
+    - tuple: (sources, targets) arrays of node indices with sources < targets.
+    """
+    sources = np.repeat(np.arange(A.shape[0]), np.diff(A.indptr))
+    targets = A.indices
+    upper = sources < targets
+    return sources[upper], targets[upper]
 
 
 def generate_node_colors(G, attribute, color_map, default_color="gray"):
@@ -24,19 +112,41 @@ def generate_node_colors(G, attribute, color_map, default_color="gray"):
     - G (networkx.Graph): The NetworkX graph.
     - attribute (str): The node attribute used for coloring 
                        (e.g., 'true_state' or 'state').
-    - color_map (dict): A dictionary mapping attribute values to colors.
+    - color_map (dict): A dictionary mapping attribute values to colors; for
+                        'true_state' and 'state' a state can be keyed by
+                        its label or by its code.
     - default_color (str): Color for nodes without the specified attribute.
 
     Returns:
     - list: A list of colors for each node based on the specified attribute.
     """
-    return [
-        color_map.get(G.nodes[node].get(attribute, default_color), default_color)
-        for node in G.nodes()
-    ]
+    if attribute not in _STATE_ATTRIBUTES:
+        return [
+            color_map.get(value, default_color)
+            for _, value in G.nodes(data=attribute, default=default_color)
+        ]
+
+    # State values are colored with one palette gather; the last palette entry
+    # is picked up by the -1 code of values that are not states
+    codes = encode_states(G, attribute)
+    palette = np.array(
+        [
+            color_map.get(label, color_map.get(code, default_color))
+            for label, code in _STATE_CODES.items()
+        ] + [default_color],
+        dtype=object
+    )
+    colors = palette[codes]
+    # Any other value falls back to a plain color_map lookup
+    others = np.flatnonzero(codes < 0)
+    if others.size:
+        values = [value for _, value in G.nodes(data=attribute, default=default_color)]
+        for i in others:
+            colors[i] = color_map.get(values[i], default_color)
+    return colors.tolist()
 
 
-def add_fraud_accomplice_edges(G, max_accomplice_edges=5):
+def add_fraud_accomplice_edges(G, max_accomplice_edges=5, true_state_codes=None):
     """
     Add edges between nodes labeled as 'Fraud' and randomly selected 'Accomplice' nodes.
 
@@ -44,51 +154,308 @@ def add_fraud_accomplice_edges(G, max_accomplice_edges=5):
     - G (networkx.Graph): The NetworkX graph.
     - max_accomplice_edges (int): Maximum number of accomplices to connect 
                                   to each fraud node.
+    - true_state_codes (numpy.ndarray): Optional precomputed output of
+                                        `encode_states(G, 'true_state')`.
+    """
+    if true_state_codes is None:
+        true_state_codes = encode_states(G, "true_state")
+    nodes = list(G)
+    frauds = [nodes[i] for i in np.flatnonzero(true_state_codes == _STATE_CODES["Fraud"])]
+    accomplices = [
+        nodes[i] for i in np.flatnonzero(true_state_codes == _STATE_CODES["Accomplice"])
+    ]
+
+    k = min(max_accomplice_edges, len(accomplices))
+    adj = G._adj  # Direct adjacency access skips the G.adj view on every check
+    add_edge = G.add_edge
+    for node in frauds:
+        for accomplice in random.sample(accomplices, k):
+            if accomplice not in adj[node]:
+                add_edge(node, accomplice)
+
+
+def _fruchterman_reingold_step(pos, indptr, indices, weights, k, t):
+    """
+    Run one Fruchterman-Reingold iteration in place on CSR adjacency arrays.
+
+    Parameters:
+    - pos (numpy.ndarray): float32 array of shape (N, 2) with node positions.
+    - indptr (numpy.ndarray): CSR row pointer array of the adjacency matrix.
+    - indices (numpy.ndarray): CSR column index array of the adjacency matrix.
+    - weights (numpy.ndarray): CSR data array holding the edge weights.
+    - k (float): Optimal distance between nodes.
+    - t (float): Current temperature, the maximum displacement per node.
+    """
+    n = pos.shape[0]
+    disp = np.zeros_like(pos)
+    for i in prange(n):
+        dx = 0.0
+        dy = 0.0
+        # Repulsive force from every other node
+        for j in range(n):
+            if j != i:
+                delta_x = pos[i, 0] - pos[j, 0]
+                delta_y = pos[i, 1] - pos[j, 1]
+                dist_sq = max(delta_x * delta_x + delta_y * delta_y, 1e-4)
+                dx += delta_x * k * k / dist_sq
+                dy += delta_y * k * k / dist_sq
+        # Attractive force from neighbors only, scaled by edge weight as in nx.spring_layout
+        for idx in range(indptr[i], indptr[i + 1]):
+            j = indices[idx]
+            delta_x = pos[i, 0] - pos[j, 0]
+            delta_y = pos[i, 1] - pos[j, 1]
+            dist = max(np.sqrt(delta_x * delta_x + delta_y * delta_y), 0.01)
+            dx -= weights[idx] * delta_x * dist / k
+            dy -= weights[idx] * delta_y * dist / k
+        # Normalize so that each node moves at most t
+        length = max(np.sqrt(dx * dx + dy * dy), 0.01)
+        disp[i, 0] = dx / length
+        disp[i, 1] = dy / length
+    pos += disp * t
+
+
+if njit is not None:
+    # cache=True keeps the compiled kernel on disk, so only the first run pays for the JIT
+    _fruchterman_reingold_step = njit(parallel=True, fastmath=True, cache=True)(
+        _fruchterman_reingold_step
+    )
+
+
+def numba_spring_layout(G, iterations=50, seed=None):
+    """
+    Compute a Fruchterman-Reingold layout with a Numba-compiled force kernel.
+
+    Edges without a 'weight' attribute count as weight 1, as in `nx.spring_layout`.
+
+    Parameters:
+    - G (networkx.Graph): The NetworkX graph to lay out.
+    - iterations (int): Number of layout iterations.
+    - seed (int): Seed for the initial random positions.
+
+    Returns:
+    - dict: A mapping of nodes to (x, y) positions.
+    """
+    nodes = list(G)
+    if not nodes:
+        return {}
+    A = to_csr(G)
+    pos = np.random.default_rng(seed).random((len(nodes), 2), dtype=np.float32)
+    k = np.float32(np.sqrt(1.0 / len(nodes)))
+    # Linear cooling schedule, as in nx.spring_layout
+    t = 0.1
+    dt = t / (iterations + 1)
+    for _ in range(iterations):
+        _fruchterman_reingold_step(pos, A.indptr, A.indices, A.data, k, np.float32(t))
+        t -= dt
+    return dict(zip(nodes, nx.rescale_layout(pos)))
+
+
+def compute_layout(G, iterations=50):
+    """
+    Compute node positions for drawing a graph.
+
+    Uses the Barnes-Hut ForceAtlas2 layout from the optional `fa2` (or
+    `fa2_modified`) package, which scales as O(N log N) per iteration. Without
+    it, or if it fails, graphs of at least
+    `_NUMBA_LAYOUT_MIN_NODES` nodes use the Numba-compiled `numba_spring_layout`
+    if `numba` is installed, and all others use `nx.spring_layout`.
+
+    Parameters:
+    - G (networkx.Graph): The NetworkX graph to lay out.
+    - iterations (int): Number of layout iterations.
+
+    Returns:
+    - dict: A mapping of nodes to (x, y) positions.
     """
-    for node in G.nodes:
-        if G.nodes[node].get("true_state") == "Fraud":
-            accomplices = [
-                n for n in G.nodes if G.nodes[n].get("true_state") == "Accomplice"
-            ]
-            accomplice_neighbors = random.sample(
-                accomplices, min(max_accomplice_edges, len(accomplices))
-            )
-            for accomplice in accomplice_neighbors:
-                if not G.has_edge(node, accomplice):
-                    G.add_edge(node, accomplice)
+    if ForceAtlas2 is not None:
+        forceatlas2 = ForceAtlas2(barnesHutOptimize=True, barnesHutTheta=1.2, verbose=False)
+        try:
+            # Pass the adjacency matrix directly: older fa2 releases build it in
+            # forceatlas2_networkx_layout with nx.to_scipy_sparse_matrix, removed in NetworkX 3.0
+            return dict(zip(G, forceatlas2.forceatlas2(to_csr(G), iterations=iterations)))
+        except Exception as error:
+            warnings.warn(f"ForceAtlas2 layout failed ({error!r}); falling back")
+    if njit is not None and len(G) >= _NUMBA_LAYOUT_MIN_NODES:
+        return numba_spring_layout(G, iterations=iterations)
+    return nx.spring_layout(G, iterations=iterations)
 
 
-def visualize_graph(G, attribute, color_map, subset_size=100, title="Graph Visualization"):
+def _datashader_available():
+    """
+    Check whether the optional `datashader` backend can be imported.
+
+    The imports are deferred to here and `_draw_datashader`, because
+    `datashader.bundling` takes seconds to import and the default
+    'matplotlib' backend never needs it.
+
+    Returns:
+    - bool: True if `datashader` and `pandas` are importable.
+    """
+    try:
+        import datashader.bundling
+        import pandas
+    except ImportError:
+        return False
+    return True
+
+
+def cugraph_layout(G, iterations=50):
+    """
+    Compute a ForceAtlas2 layout on the GPU with `cugraph`.
+
+    `cudf` and `cugraph` are imported on call, so an ImportError is raised
+    when they are missing.
+
+    Parameters:
+    - G (networkx.Graph): The NetworkX graph to lay out.
+    - iterations (int): Number of layout iterations.
+
+    Returns:
+    - dict: A mapping of nodes to (x, y) positions. Isolated nodes,
+            which cugraph does not place, are put at the origin.
+    """
+    import cudf
+    import cugraph
+
+    nodes = list(G)
+    sources, targets = _csr_edge_list(to_csr(G))
+    G_cu = cugraph.Graph()
+    G_cu.from_cudf_edgelist(
+        cudf.DataFrame({"source": sources, "target": targets}),
+        source="source",
+        destination="target"
+    )
+    positions = cugraph.force_atlas2(G_cu, max_iter=iterations).to_pandas()
+    xy = np.zeros((len(nodes), 2))
+    xy[positions["vertex"].to_numpy(), 0] = positions["x"].to_numpy()
+    xy[positions["vertex"].to_numpy(), 1] = positions["y"].to_numpy()
+    return dict(zip(nodes, xy))
+
+
+def _draw_datashader(G, pos, attribute, color_map, ax, default_color="gray"):
+    """
+    Rasterize a graph with datashader and show the image on a Matplotlib axis.
+
+    Parameters:
+    - G (networkx.Graph): The NetworkX graph to draw.
+    - pos (dict): A mapping of nodes to (x, y) positions.
+    - attribute (str): The node attribute used for coloring (e.g., 'true_state' or 'state').
+    - color_map (dict): A dictionary mapping attribute values to colors; for
+                        'true_state' and 'state' a state can be keyed by
+                        its label or by its code.
+    - ax (matplotlib.axes.Axes): The axis to draw on.
+    - default_color (str): Color for nodes without the specified attribute.
+    """
+    import datashader as ds
+    import datashader.transfer_functions as tf
+    import pandas as pd
+    from datashader.bundling import connect_edges
+
+    nodes = list(G)
+    xy = np.array([pos[node] for node in nodes], dtype=float)
+    # Categorize nodes by their color, so both backends share generate_node_colors
+    colors = generate_node_colors(G, attribute, color_map, default_color)
+    nodes_df = pd.DataFrame({"x": xy[:, 0], "y": xy[:, 1], attribute: pd.Categorical(colors)})
+    color_key = {color: to_hex(color) for color in set(colors)}
+
+    # Share one canvas range so that edges and nodes line up when stacked
+    padding = 0.05 * max(np.ptp(xy, axis=0).max(), 1e-9)
+    x_range = (xy[:, 0].min() - padding, xy[:, 0].max() + padding)
+    y_range = (xy[:, 1].min() - padding, xy[:, 1].max() + padding)
+    cvs = ds.Canvas(plot_width=800, plot_height=800, x_range=x_range, y_range=y_range)
+
+    images = []
+    sources, targets = _csr_edge_list(to_csr(G))
+    if len(sources):
+        edges_df = pd.DataFrame({"source": sources, "target": targets})
+        segments = connect_edges(nodes_df, edges_df)
+        edge_agg = cvs.line(segments, "x", "y", agg=ds.count())
+        images.append(tf.shade(edge_agg, cmap=["lightgray", "black"]))
+    node_agg = cvs.points(nodes_df, "x", "y", ds.count_cat(attribute))
+    images.append(tf.spread(tf.shade(node_agg, color_key=color_key), px=3))
+
+    ax.imshow(tf.stack(*images).to_pil(), extent=(*x_range, *y_range))
+    ax.set_axis_off()
+
+
+def visualize_graph(
+    G,
+    attribute,
+    color_map,
+    subset_size=100,
+    title="Graph Visualization",
+    backend="matplotlib",
+    pos=None,
+    subset=None,
+    ax=None
+):
     """
     Visualize a subset of nodes in a graph with colors based on a specified node attribute.
 
     Parameters:
     - G (networkx.Graph): The NetworkX graph.
     - attribute (str): The node attribute used for coloring (e.g., 'true_state' or 'state').
-    - color_map (dict): A dictionary mapping attribute values to colors.
+    - color_map (dict): A dictionary mapping attribute values to colors; for
+                        'true_state' and 'state' a state can be keyed by
+                        its label or by its code.
     - subset_size (int): Number of nodes to visualize.
     - title (str): Title for the visualization.
+    - backend (str): 'matplotlib' to draw with `nx.draw`, or 'datashader' to
+                     rasterize large subsets with the optional `datashader`
+                     package, using a GPU layout when `cugraph` is available.
+                     Falls back to 'matplotlib' with a warning when
+                     `datashader` is not installed.
+    - pos (dict): Optional precomputed node positions, e.g. from `compute_layout`,
+                  to reuse one layout across several visualizations.
+    - subset (networkx.Graph): Optional subgraph to draw instead of the first
+                               `subset_size` nodes of `G`.
+    - ax (matplotlib.axes.Axes): Optional axis to draw on. When given, no new
+                                 figure is created and the caller shows the plot.
     """
-    subset = G.subgraph(list(G.nodes())[:subset_size])
-    pos = nx.spring_layout(subset)
+    if backend not in ("matplotlib", "datashader"):
+        raise ValueError(f"Unknown backend: {backend!r}")
+    if backend == "datashader" and not _datashader_available():
+        warnings.warn(
+            "The 'datashader' backend requires datashader and pandas; "
+            "falling back to 'matplotlib'"
+        )
+        backend = "matplotlib"
 
-    # Generate node colors based on the specified attribute
-    node_colors = [
-        color_map.get(G.nodes[node].get(attribute, "gray"), "gray")
-        for node in subset.nodes()
-    ]
+    if subset is None:
+        subset = G.subgraph(list(islice(G.nodes(), subset_size)))
 
-    plt.figure(figsize=(8, 8))
-    nx.draw(
-        subset,
-        pos,
-        node_color=node_colors,
-        with_labels=True,
-        node_size=50,
-        font_size=8
-    )
-    plt.title(title)
-    plt.show()
+    if backend == "datashader":
+        if pos is None:
+            try:
+                pos = cugraph_layout(subset)
+            except ImportError:
+                pos = compute_layout(subset)
+            except Exception as error:  # e.g. cudf installed on a machine without a GPU
+                warnings.warn(f"cugraph layout failed ({error!r}); falling back")
+                pos = compute_layout(subset)
+    elif pos is None:
+        pos = compute_layout(subset)
+
+    show = ax is None
+    if show:
+        _, ax = plt.subplots(figsize=(8, 8))
+
+    if backend == "datashader":
+        _draw_datashader(subset, pos, attribute, color_map, ax)
+    else:
+        nx.draw(
+            subset,
+            pos,
+            ax=ax,
+            node_color=generate_node_colors(subset, attribute, color_map),
+            with_labels=True,
+            node_size=50,
+            font_size=8
+        )
+    ax.set_title(title)
+
+    if show:
+        plt.show()
 
 
 def save_graph(G, output_file):
@@ -112,36 +479,36 @@ if __name__ == "__main__":
 
     # Load the graph
     G = load_graph(input_file)
-
-    # Generate color mappings based on `true_state` and `state` attributes
-    node_colors_true_state = generate_node_colors(G, "true_state", color_map)
-    node_colors_state = generate_node_colors(G, "state", color_map)
+    true_state_codes = encode_states(G, "true_state")
 
     # Optional: Add edges between 'Fraud' and 'Accomplice' nodes
-    add_fraud_accomplice_edges(G)
+    add_fraud_accomplice_edges(G, true_state_codes=true_state_codes)
 
-    # Visualize the graph based on `true_state
+    # Visualize the graph based on `true_state` and `state`, sharing one subset and layout
     subset_size = 100  # Visualize a subset of 100 nodes for clarity
-    fig, (ax1) = plt.subplots(1, figsize=(8, 8))
-
-    # Visualization for `true_state`
-    subset_true_state = G.subgraph(list(G.nodes())[:subset_size])
-    pos = nx.spring_layout(subset_true_state)
-    nx.draw(
-        subset_true_state,
-        pos,
-        ax=ax1,
-        node_color=[
-            color_map.get(G.nodes[node].get("true_state", "gray"), "gray")
-            for node in subset_true_state.nodes()
-        ],
-        with_labels=True,
-        node_size=50,
-        font_size=8
-    )
-    ax1.set_title("Synthetic Network with Roles Based on true_state Attribute")
+    subset = G.subgraph(list(islice(G.nodes(), subset_size)))
+    pos = compute_layout(subset)
 
+    _, ax1 = plt.subplots(1, figsize=(8, 8))
+    visualize_graph(
+        G,
+        "true_state",
+        color_map,
+        title="Synthetic Network with Roles Based on true_state Attribute",
+        pos=pos,
+        subset=subset,
+        ax=ax1
+    )
     plt.show()
 
+    visualize_graph(
+        G,
+        "state",
+        color_map,
+        title="Synthetic Network with Roles Based on state Attribute",
+        pos=pos,
+        subset=subset
+    )
+
     # Save the modified graph with additional edges
     save_graph(G, output_file)
@@ -1,5 +1,10 @@
 import networkx as nx
+import numpy as np
 import random
+from itertools import islice
+
+# Node states are stored as these integer codes rather than as label strings
+_STATE_CODES = {"Fraud": 0, "Accomplice": 1, "Honest": 2}
 
 
 def generate_synthetic_network(
@@ -27,38 +32,70 @@ def generate_synthetic_network(
 
     # Set random seed for reproducibility
     random.seed(42)
+    rng = np.random.default_rng(42)
 
     # Step 1: Generate Barabási-Albert graph
     m = max(1, target_edges // num_nodes)  # Parameter for edge creation in Barabási-Albert model
-    G = nx.barabasi_albert_graph(n=num_nodes, m=m)
+    try:
+        # Imported here so that importing this module (e.g. for _STATE_CODES) stays cheap
+        import networkit as nk
+    except ImportError:  # Optional dependency; fall back to the NetworkX generator
+        nk = None
+    if nk is not None:
+        # networkit's C++ generator avoids NetworkX's pure-Python attachment loop
+        nk.setSeed(42, False)
+        G = nk.nxadapter.nk2nx(
+            nk.generators.BarabasiAlbertGenerator(k=m, nMax=num_nodes).generate()
+        )
+    else:
+        G = nx.barabasi_albert_graph(n=num_nodes, m=m)
 
     # Step 2: Add random edges to meet the target edge count
-    existing_edges = set(G.edges())
-    nodes_list = list(G.nodes())
-    while G.number_of_edges() < target_edges:
-        node1, node2 = random.sample(nodes_list, 2)
-        if (node1, node2) not in existing_edges and (node2, node1) not in existing_edges:
-            G.add_edge(node1, node2, weight=random.uniform(0.1, 1.0))
-            existing_edges.add((node1, node2))
+    adj = G._adj  # The adjacency dict already answers "is this edge present?"
+    edge_count = G.number_of_edges()  # Tracked by hand instead of recounting the adjacency
+    while edge_count < target_edges:
+        need = target_edges - edge_count
+        # Oversample candidate pairs to cover self-loops, duplicates and existing edges
+        candidates = rng.integers(0, num_nodes, size=(need * 2, 2))
+        candidates = candidates[candidates[:, 0] != candidates[:, 1]]
+        candidates = np.sort(candidates, axis=1)
+        # Deduplicate while keeping draw order, so low node ids are not favoured
+        _, first_index = np.unique(candidates, axis=0, return_index=True)
+        candidates = candidates[np.sort(first_index)]
+        new_edges = [
+            (node1, node2) for node1, node2 in candidates.tolist() if node2 not in adj[node1]
+        ][:need]
+        weights = rng.uniform(0.1, 1.0, len(new_edges))
+        G.add_edges_from(
+            (node1, node2, {"weight": weight})
+            for (node1, node2), weight in zip(new_edges, weights.tolist())
+        )
+        edge_count += len(new_edges)
 
     # Step 3: Assign true states and initial beliefs to each node
-    state_counts = {"Fraud": 0, "Accomplice": 0, "Honest": 0}
-    for node in G.nodes():
-        true_state = random.choices(
-            ["Fraud", "Accomplice", "Honest"],
-            weights=[
-                state_distribution["Fraud"],
-                state_distribution["Accomplice"],
-                state_distribution["Honest"]
-            ],
-            k=1
-        )[0]
-        G.nodes[node]["true_state"] = true_state
-        G.nodes[node]["belief_fraud"] = initial_belief["Fraud"]
-        G.nodes[node]["belief_accomplice"] = initial_belief["Accomplice"]
-        G.nodes[node]["belief_honest"] = initial_belief["Honest"]
-        G.nodes[node]["state"] = random.choice(["Fraud", "Accomplice", "Honest"])
-        state_counts[true_state] += 1
+    # Draw every node's states up front, then write each attribute in one batch
+    nodes_list = list(G.nodes())
+    weights = np.array([state_distribution[label] for label in _STATE_CODES])
+    true_states = rng.choice(
+        len(_STATE_CODES), size=len(nodes_list), p=weights / weights.sum()
+    ).astype(np.int8)
+    states = rng.choice(len(_STATE_CODES), size=len(nodes_list)).astype(np.int8)
+    # tolist() hands back plain Python ints, which GraphML can type
+    nx.set_node_attributes(G, dict(zip(nodes_list, true_states.tolist())), "true_state")
+    # Every node starts with the same beliefs, so they become GraphML key defaults
+    # (written from G.graph["node_default"]) instead of one <data> element per node.
+    # NetworkX only declares keys that some node carries, so the first node keeps them;
+    # load_graph in assign_roles_and_visualize.py fills them back in on the others.
+    G.graph["node_default"] = {
+        "belief_fraud": initial_belief["Fraud"],
+        "belief_accomplice": initial_belief["Accomplice"],
+        "belief_honest": initial_belief["Honest"]
+    }
+    G.nodes[nodes_list[0]].update(G.graph["node_default"])
+    nx.set_node_attributes(G, dict(zip(nodes_list, states.tolist())), "state")
+    state_counts = dict(
+        zip(_STATE_CODES, np.bincount(true_states, minlength=len(_STATE_CODES)).tolist())
+    )
 
     # Step 4: Print the target vs. generated distribution for verification
     total_nodes = sum(state_counts.values())
@@ -74,14 +111,15 @@ def generate_synthetic_network(
     G.graph["target_edges"] = target_edges
     G.graph["initial_belief"] = str(initial_belief)  # Convert to string for GraphML compatibility
     G.graph["state_distribution"] = str(state_distribution)
+    G.graph["state_codes"] = str(_STATE_CODES)
 
     # Step 6: Output graph characteristics and save
-    avg_degree = sum(dict(G.degree()).values()) / num_nodes
+    avg_degree = 2 * edge_count / num_nodes  # Degrees of an undirected graph sum to 2|E|
     print(f"Average degree: {avg_degree:.2f}")
-    print(f"Generated synthetic graph with {G.number_of_nodes()} nodes and {G.number_of_edges()} edges (target: {target_edges} edges).")
+    print(f"Generated synthetic graph with {G.number_of_nodes()} nodes and {edge_count} edges (target: {target_edges} edges).")
     print("Example node data with true states (first 5 nodes):")
-    for node, data in list(G.nodes(data=True))[:5]:
-        print(f"Node {node}: {data}")
+    for node, data in islice(G.nodes(data=True), 5):
+        print(f"Node {node}: {dict(G.graph['node_default'], **data)}")
 
     # Save the generated graph to a file
     nx.write_graphml(G, output_file)